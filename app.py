@@ -1,15 +1,13 @@
 import streamlit as st
 import os
-import sys
+import re
 import time
-import yt_dlp
-from datetime import datetime
-import tempfile
-import pandas as pd
+import queue
+from contextlib import contextmanager
 
 # Import core functionality from downloader.py
 # We'll keep the core functions but adapt them to work with Streamlit
-from downloader import get_available_formats
+from downloader import get_available_formats, create_info_extractor, download_extracted_info, BYTES_PER_MB, YOUTUBE_EXTRACTOR_ARGS
 
 # Initialize session state for tracking file decisions
 if 'file_decision_made' not in st.session_state:
@@ -30,6 +28,82 @@ st.set_page_config(
 # Platform-independent default save path
 DEFAULT_SAVE_PATH = os.path.join(os.path.expanduser("~"), "Downloads")
 
+# Minimum seconds between download progress UI updates
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# Matches URLs pointing at YouTube
+YOUTUBE_URL_RE = re.compile(r"(?:youtube\.com|youtu\.be)")
+
+# Extracts the 11-character video ID, used as the on-disk format cache key
+YOUTUBE_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|shorts/)([\w-]{11})")
+
+# On-disk format cache, shared across sessions and server restarts
+FORMAT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ytdl-app")
+FORMAT_CACHE_TTL = 6 * 60 * 60  # seconds
+
+# Columns of the format selection table
+FORMAT_TABLE_COLUMNS = ("ID", "Format ID", "Resolution", "FPS", "Size", "Type", "Content")
+
+class FormatLookupError(Exception):
+    """Raised when formats can't be retrieved, so st.cache_data doesn't memoize the failure"""
+
+@st.cache_resource
+def get_info_extractor_pool():
+    """Idle YoutubeDL instances for format lookups, kept warm across reruns and sessions"""
+    return queue.SimpleQueue()
+
+@contextmanager
+def borrow_info_extractor():
+    """Borrow a YoutubeDL from the pool for the duration of one lookup"""
+    # YoutubeDL isn't thread-safe, so each concurrent lookup gets its own instance;
+    # the pool only grows to the peak number of simultaneous lookups
+    pool = get_info_extractor_pool()
+    try:
+        ydl = pool.get_nowait()
+    except queue.Empty:
+        ydl = create_info_extractor()
+    try:
+        yield ydl
+    finally:
+        pool.put(ydl)
+
+@st.cache_resource
+def get_format_disk_cache():
+    """Open the on-disk format cache once per server process (None if unavailable)"""
+    # Imported lazily so the first render of the page doesn't wait on it
+    import diskcache
+    
+    try:
+        return diskcache.Cache(FORMAT_CACHE_DIR)
+    except Exception as e:
+        # e.g. a read-only home directory in a container - carry on with the in-memory cache only
+        print(f"⚠️ On-disk format cache disabled: {str(e)}")
+        return None
+
+@st.cache_data(ttl=600, show_spinner=False)
+def cached_get_available_formats(url):
+    """Fetch formats once per URL so widget reruns don't repeat the yt-dlp lookup"""
+    # Check the on-disk cache first so previously seen videos survive restarts
+    match = YOUTUBE_VIDEO_ID_RE.search(url)
+    video_id = match.group(1) if match else None
+    disk_cache = get_format_disk_cache() if video_id else None
+    if disk_cache is not None:
+        cached = disk_cache.get(video_id)
+        if cached is not None and cached.get('id') == video_id:
+            return cached
+    
+    with borrow_info_extractor() as ydl:
+        formats_info = get_available_formats(url, ydl=ydl)
+    
+    # Raise rather than return None - exceptions aren't cached, so the next rerun retries
+    if not formats_info:
+        raise FormatLookupError(url)
+    
+    # Only persist results that really are for this video ID - the key ignores the rest of the URL
+    if disk_cache is not None and formats_info.get('id') == video_id:
+        disk_cache.set(video_id, formats_info, expire=FORMAT_CACHE_TTL)
+    return formats_info
+
 def main():
     """Main Streamlit app function"""
     st.title("📺 YouTube Downloader")
@@ -63,14 +137,18 @@ def main():
     url = st.text_input("🔗 Enter YouTube URL", help="Enter a YouTube URL to download")
     
     # URL validation
-    if url and ("youtube.com" not in url and "youtu.be" not in url):
+    is_youtube_url = bool(url and YOUTUBE_URL_RE.search(url))
+    if url and not is_youtube_url:
         st.warning("Please enter a valid YouTube URL")
     
-    if url and ("youtube.com" in url or "youtu.be" in url):
+    if is_youtube_url:
         # Try to get formats
         with st.spinner("Fetching video information..."):
             try:
-                formats_info = get_available_formats(url)
+                try:
+                    formats_info = cached_get_available_formats(url)
+                except FormatLookupError:
+                    formats_info = None
                 if not formats_info:
                     st.error("Could not retrieve video information")
                     return
@@ -84,110 +162,94 @@ def main():
                 video_formats = [f for f in formats if f['has_video']]
                 audio_formats = [f for f in formats if not f['has_video'] and f['has_audio']]
                 
-                # Prepare data for the table
-                format_data = []
+                # Prepare data for the table as one list per column, in FORMAT_TABLE_COLUMNS order
+                format_columns = {column: [] for column in FORMAT_TABLE_COLUMNS}
+                def add_format_row(*values):
+                    for column, value in zip(FORMAT_TABLE_COLUMNS, values):
+                        format_columns[column].append(value)
                 
                 # Add video formats - ensure all values are strings to avoid type issues
                 for i, fmt in enumerate(video_formats):
                     media_type = "Video"
                     if fmt['has_audio']:
                         media_type += "+Audio"
-                    format_data.append({
-                        "ID": str(i),
-                        "Format ID": str(fmt['format_id']),
-                        "Resolution": str(fmt['resolution']),
-                        "FPS": str(fmt['fps']),  # Convert all FPS values to strings
-                        "Size": str(fmt['filesize']),
-                        "Type": str(fmt['ext']),
-                        "Content": media_type
-                    })
+                    add_format_row(str(i), str(fmt['format_id']), str(fmt['resolution']), str(fmt['fps']),
+                                   str(fmt['filesize']), str(fmt['ext']), media_type)
                 
                 # Add audio formats
                 for i, fmt in enumerate(audio_formats):
                     idx = i + len(video_formats)
-                    format_data.append({
-                        "ID": str(idx),
-                        "Format ID": str(fmt['format_id']),
-                        "Resolution": "audio only",
-                        "FPS": "-",  # Consistent string value
-                        "Size": str(fmt['filesize']),
-                        "Type": str(fmt['ext']),
-                        "Content": "Audio only"
-                    })
+                    add_format_row(str(idx), str(fmt['format_id']), "audio only", "-",
+                                   str(fmt['filesize']), str(fmt['ext']), "Audio only")
                 
                 # Add best options
-                format_data.append({
-                    "ID": str(len(formats)),
-                    "Format ID": "best",
-                    "Resolution": "best",
-                    "FPS": "auto",  # Already a string
-                    "Size": "auto",  # Already a string
-                    "Type": "mp4",
-                    "Content": "Best quality"
-                })
-                
-                format_data.append({
-                    "ID": str(len(formats) + 1),
-                    "Format ID": "bestaudio",
-                    "Resolution": "audio",
-                    "FPS": "auto",  # Already a string
-                    "Size": "auto",  # Already a string
-                    "Type": "mp3",
-                    "Content": "Best audio"
-                })
+                add_format_row(str(len(formats)), "best", "best", "auto", "auto", "mp4", "Best quality")
+                add_format_row(str(len(formats) + 1), "bestaudio", "audio", "auto", "auto", "mp3", "Best audio")
                 
-                # Display formats as a table - explicitly specify dtypes
+                # Display formats as a table
                 st.subheader("📋 Available formats:")
                 
-                # Create dataframe with all string dtypes to avoid conversion issues
-                df = pd.DataFrame(format_data).astype(str)
+                # Imported lazily so the first render of the page doesn't wait on pandas
+                import pandas as pd
+                
+                # Every value is already a string, so pandas can take the columns as they are
+                df = pd.DataFrame(format_columns, columns=FORMAT_TABLE_COLUMNS, copy=False)
                 st.dataframe(df, use_container_width=True)
                 
                 # Format selection
-                format_options = [
-                    {"label": f"ID {row['ID']}: {row['Resolution']} - {row['Content']} ({row['Type']})", "value": i} 
-                    for i, row in enumerate(format_data)
+                format_labels = [
+                    f"ID {row_id}: {resolution} - {content} ({ext})"
+                    for row_id, resolution, content, ext in zip(
+                        format_columns["ID"], format_columns["Resolution"], format_columns["Content"], format_columns["Type"]
+                    )
                 ]
-                format_dict = {i: row["Format ID"] for i, row in enumerate(format_data)}
                 
                 col1, col2 = st.columns([2, 1])
                 with col1:
                     selected_format_idx = st.selectbox(
                         "Select format to download:",
-                        options=range(len(format_options)),
-                        format_func=lambda x: format_options[x]["label"],
+                        options=range(len(format_labels)),
+                        format_func=lambda x: format_labels[x],
                         index=len(formats)  # Default to best quality
                     )
                 
-                # Get actual format_id
+                # Get actual format_id (and its size, when yt-dlp reported one)
+                filesize_bytes = None
                 if selected_format_idx == len(formats):
                     format_id = "best[ext=mp4]"
                 elif selected_format_idx == len(formats) + 1:
                     format_id = "bestaudio[ext=mp3]/bestaudio"
                 else:
                     if selected_format_idx < len(video_formats):
-                        format_id = video_formats[selected_format_idx]['format_id']
+                        selected_format = video_formats[selected_format_idx]
                     else:
                         audio_idx = selected_format_idx - len(video_formats)
-                        format_id = audio_formats[audio_idx]['format_id']
+                        selected_format = audio_formats[audio_idx]
+                    format_id = selected_format['format_id']
+                    filesize_bytes = selected_format.get('filesize_bytes')
                 
                 with col2:
                     st.text("")
                     st.text("")
                     if st.button("⬇️ Download", type="primary", use_container_width=True):
-                        download_with_streamlit(url, save_dir, format_id, force_download, concurrent_fragments, audio_quality)
+                        download_with_streamlit(url, save_dir, format_id, force_download, concurrent_fragments, audio_quality, filesize_bytes)
                 
             except Exception as e:
                 st.error(f"Error processing URL: {str(e)}")
 
-def download_with_streamlit(url, output_path, format_id, force=False, concurrent_fragments=5, audio_quality="192"):
+def download_with_streamlit(url, output_path, format_id, force=False, concurrent_fragments=5, audio_quality="192", filesize_bytes=None):
     """Download video using yt-dlp with Streamlit UI"""
+    # Imported lazily; only needed once a download is actually requested
+    import yt_dlp
+    
     try:
-        # Get video info first
+        # Get video info first from a pooled extractor - reused for the title and the download itself.
+        # The extractor sets noplaylist, so watch?v=...&list=... URLs give just this video; the
+        # download instance's own noplaylist never applies since it only consumes this info
         with st.spinner("Preparing download..."):
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(url, download=False)
-                video_title = info.get('title', 'video').replace('/', '_').replace('\\', '_')
+            with borrow_info_extractor() as info_ydl:
+                info = info_ydl.extract_info(url, download=False)
+            video_title = info.get('title', 'video').replace('/', '_').replace('\\', '_')
         
         # Check if file exists
         potential_filename = os.path.join(output_path, f"{video_title}.mp4")
@@ -247,7 +309,7 @@ def download_with_streamlit(url, output_path, format_id, force=False, concurrent
             st.session_state.file_decision = None
             st.session_state.new_filename = None
         
-        # Configure yt-dlp options
+        # Configure yt-dlp options now that the filename and overwrite decision are final
         ydl_opts = {
             'format': format_id,
             'outtmpl': os.path.join(output_path, f"{video_title}.%(ext)s"),
@@ -256,6 +318,7 @@ def download_with_streamlit(url, output_path, format_id, force=False, concurrent
             'noplaylist': True,
             'overwrites': force,
             'concurrent_fragment_downloads': concurrent_fragments,
+            'extractor_args': YOUTUBE_EXTRACTOR_ARGS,
         }
         
         # Add MP3 conversion if requested
@@ -280,8 +343,15 @@ def download_with_streamlit(url, output_path, format_id, force=False, concurrent
             eta_text = st.empty()
         
         # Custom progress hook for Streamlit with better information
+        last_update = [0.0]
         def streamlit_progress_hook(d):
             if d['status'] == 'downloading':
+                # Throttle UI updates - each one is several websocket messages to the browser
+                now = time.monotonic()
+                if now - last_update[0] < PROGRESS_UPDATE_INTERVAL:
+                    return
+                last_update[0] = now
+                
                 # Calculate progress percentage
                 downloaded_bytes = d.get('downloaded_bytes', 0)
                 total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
@@ -294,12 +364,12 @@ def download_with_streamlit(url, output_path, format_id, force=False, concurrent
                     percent_text.markdown(f"<h3 style='text-align: center; margin: 0;'>{percentage:.1%}</h3>", unsafe_allow_html=True)
                 
                 # Format file sizes
-                downloaded_mb = downloaded_bytes / (1024 * 1024)
-                total_mb = total_bytes / (1024 * 1024) if total_bytes else 0
+                downloaded_mb = downloaded_bytes / BYTES_PER_MB
+                total_mb = total_bytes / BYTES_PER_MB if total_bytes else 0
                 
                 # Update status and information
                 speed = d.get('speed', 0)
-                speed_str = f"{speed / (1024 * 1024):.2f} MB/s" if speed else "N/A"
+                speed_str = f"{speed / BYTES_PER_MB:.2f} MB/s" if speed else "N/A"
                 eta = d.get('eta', 0)
                 eta_str = f"{eta // 60}m {eta % 60}s" if eta else "N/A"
                 
@@ -320,30 +390,15 @@ def download_with_streamlit(url, output_path, format_id, force=False, concurrent
         # Add our custom progress hook
         ydl_opts['progress_hooks'] = [streamlit_progress_hook]
         
-        # Get estimated file size before download (when possible)
-        with st.spinner("Estimating file size..."):
-            try:
-                with yt_dlp.YoutubeDL({'quiet': True, 'format': format_id}) as ydl:
-                    info = ydl.extract_info(url, download=False, process=True)
-                    
-                    # Try to get selected format info
-                    selected_format = None
-                    for fmt in info.get('formats', []):
-                        if fmt.get('format_id') == format_id:
-                            selected_format = fmt
-                            break
-                    
-                    if selected_format and selected_format.get('filesize'):
-                        filesize_mb = selected_format.get('filesize') / (1024 * 1024)
-                        file_size_text.text(f"📦 Estimated file size: {filesize_mb:.1f} MB")
-            except:
-                # If estimation fails, just continue with download
-                pass
+        # Show estimated file size from the format list (when known)
+        if filesize_bytes:
+            filesize_mb = filesize_bytes / BYTES_PER_MB
+            file_size_text.text(f"📦 Estimated file size: {filesize_mb:.1f} MB")
         
-        # Download the video
+        # Download the video from the already extracted info
         with st.spinner("Starting download..."):
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                download_extracted_info(ydl, info)
         
         # Determine the expected file path
         if 'bestaudio' in format_id and 'mp3' in format_id:
@@ -353,16 +408,21 @@ def download_with_streamlit(url, output_path, format_id, force=False, concurrent
             file_path = os.path.join(output_path, f"{video_title}.mp4")
             file_type = "Video"
         
+        # Stat the file once - tells us both whether it exists and how big it is
+        try:
+            file_stat = os.stat(file_path)
+        except FileNotFoundError:
+            file_stat = None
+        
         # Show success message
-        if os.path.exists(file_path):
-            file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        if file_stat:
+            file_size_mb = file_stat.st_size / BYTES_PER_MB
             st.success(f"✅ Download completed! {file_type} saved to {file_path} ({file_size_mb:.1f} MB)")
             
             # Add play button for audio files
-            if file_type == "Audio" and os.path.exists(file_path):
-                with open(file_path, "rb") as f:
-                    audio_bytes = f.read()
-                st.audio(audio_bytes, format="audio/mp3")
+            if file_type == "Audio":
+                # Pass the path and let Streamlit load the file into its media storage itself
+                st.audio(file_path, format="audio/mp3")
         else:
             st.warning(f"⚠️ Download possibly completed, but file not found at expected location: {file_path}")
     
@@ -1,13 +1,50 @@
 import os
 import sys
 import argparse
-import yt_dlp
+import socket
+import threading
 from datetime import datetime
 import time
 
 # Platform-independent save path
 DEFAULT_SAVE_PATH = os.path.join(os.path.expanduser("~"), "Downloads")
 
+# Bytes in a megabyte, for human-readable sizes
+BYTES_PER_MB = 1024 * 1024
+
+# Skip the multi-MB watch page and client configs so extraction relies on the JSON player API;
+# the player clients themselves are left to yt-dlp's maintained defaults
+YOUTUBE_EXTRACTOR_ARGS = {
+    'youtube': {
+        'player_skip': ['configs', 'webpage'],
+    },
+}
+
+# yt-dlp resolves the same YouTube hosts many times per video and the stdlib
+# doesn't cache DNS, so keep successful lookups around for a short while
+DNS_CACHE_TTL = 300  # seconds
+_original_getaddrinfo = socket.getaddrinfo
+_dns_cache = {}
+_dns_cache_lock = threading.Lock()
+
+def _cached_getaddrinfo(*args, **kwargs):
+    """socket.getaddrinfo with a small in-memory TTL cache"""
+    key = (args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_cache_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+    
+    result = _original_getaddrinfo(*args, **kwargs)
+    with _dns_cache_lock:
+        if len(_dns_cache) >= 256:
+            _dns_cache.clear()
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+    return result
+
+socket.getaddrinfo = _cached_getaddrinfo
+
 def setup_argparse():
     """Setup command line argument parsing"""
     parser = argparse.ArgumentParser(description='YouTube Video Downloader using yt-dlp')
@@ -18,58 +55,89 @@ def setup_argparse():
     parser.add_argument('--force', action='store_true', help='Force re-download even if file exists')
     return parser.parse_args()
 
-def get_available_formats(url):
+def create_info_extractor():
+    """Create a YoutubeDL instance for info extraction that can be shared across URLs"""
+    # Imported lazily so importing this module (e.g. from app.py) stays cheap
+    import yt_dlp
+    
+    # Configure yt-dlp options for info extraction
+    ydl_opts = {
+        'quiet': True, # Suppress output for this step only to avoid clutter in the console
+        'noplaylist': True,  # watch?v=...&list=... URLs resolve to the single video, as downloads expect
+        'extractor_args': YOUTUBE_EXTRACTOR_ARGS,
+    }
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+def extract_video_info(url, ydl=None):
+    """Extract the video info dict once so it can be reused for listing and downloading"""
+    # Reuse the caller's instance (and its connections and player cache) when given one
+    if ydl is not None:
+        return ydl.extract_info(url, download=False)
+    
+    with create_info_extractor() as ydl:
+        return ydl.extract_info(url, download=False)
+
+def download_extracted_info(ydl, info):
+    """Download from an info dict that was extracted by a different YoutubeDL instance"""
+    import yt_dlp
+    
+    # The extracting instance already ran its own format selection and left the result
+    # (requested_formats etc.) in info; strip it the way yt-dlp does for --load-info-json
+    # so ydl selects formats from its own options instead of reusing the probe's choice.
+    # sanitize_info setdefaults a few keys on its argument, so hand it a copy to leave info untouched
+    clean_info = yt_dlp.YoutubeDL.sanitize_info(dict(info), remove_private_keys=True)
+    return ydl.process_ie_result(clean_info, download=True)
+
+def get_available_formats(url, info=None, ydl=None):
     """Get a list of available formats/resolutions for the video"""
     try:
-        print(f"\n📋 Fetching available formats from: {url}")
-        
-        # Configure yt-dlp options for format listing
-        ydl_opts = {
-            'quiet': True, # Suppress output for this step only to avoid clutter in the console
-        }
+        # Only hit the network if the caller hasn't already extracted the info
+        if info is None:
+            print(f"\n📋 Fetching available formats from: {url}")
+            info = extract_video_info(url, ydl)
         
         # Extract formats information
         formats = []
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            video_title = info.get('title', 'Unknown Title')
-            duration = info.get('duration')
-            duration_str = str(datetime.fromtimestamp(duration).strftime("%M:%S")) if duration else "Unknown"
+        video_title = info.get('title', 'Unknown Title')
+        duration = info.get('duration')
+        duration_str = str(datetime.fromtimestamp(duration).strftime("%M:%S")) if duration else "Unknown"
+        
+        print(f"\n📺 Video: {video_title}")
+        print(f"⏱️ Duration: {duration_str}")
+        print(f"👁️ Views: {info.get('view_count', 'Unknown')}")
+        
+        # Get all available formats
+        for f in info.get('formats', []):
+            # Extract useful information
+            format_id = f.get('format_id', 'N/A')
+            ext = f.get('ext', 'N/A')
+            resolution = f.get('resolution', 'N/A')
+            fps = f.get('fps', 'N/A')
+            filesize = f.get('filesize', None)
+            filesize_str = f"{filesize/BYTES_PER_MB:.1f}MB" if filesize else "Unknown"
+            vcodec = f.get('vcodec', 'N/A')
+            acodec = f.get('acodec', 'N/A')
             
-            print(f"\n📺 Video: {video_title}")
-            print(f"⏱️ Duration: {duration_str}")
-            print(f"👁️ Views: {info.get('view_count', 'Unknown')}")
+            # Skip formats without video (unless audio-only)
+            if vcodec == 'none' and not (acodec != 'none' and ext == 'mp3'):
+                continue
             
-            # Get all available formats
-            for f in info.get('formats', []):
-                # Extract useful information
-                format_id = f.get('format_id', 'N/A')
-                ext = f.get('ext', 'N/A')
-                resolution = f.get('resolution', 'N/A')
-                fps = f.get('fps', 'N/A')
-                filesize = f.get('filesize', None)
-                filesize_str = f"{filesize/(1024*1024):.1f}MB" if filesize else "Unknown"
-                vcodec = f.get('vcodec', 'N/A')
-                acodec = f.get('acodec', 'N/A')
-                
-                # Skip formats without video (unless audio-only)
-                if vcodec == 'none' and not (acodec != 'none' and ext == 'mp3'):
-                    continue
-                
-                # Create format info dictionary
-                format_info = {
-                    'format_id': format_id,
-                    'ext': ext,
-                    'resolution': resolution,
-                    'fps': fps,
-                    'filesize': filesize_str,
-                    'has_video': vcodec != 'none',
-                    'has_audio': acodec != 'none',
-                }
-                
-                formats.append(format_info)
+            # Create format info dictionary
+            format_info = {
+                'format_id': format_id,
+                'ext': ext,
+                'resolution': resolution,
+                'fps': fps,
+                'filesize': filesize_str,
+                # Most DASH formats only report an approximate size; good enough for an estimate
+                'filesize_bytes': filesize or f.get('filesize_approx'),
+                'has_video': vcodec != 'none',
+                'has_audio': acodec != 'none',
+            }
             
-        return {'title': video_title, 'formats': formats}
+            formats.append(format_info)
+        
+        return {'id': info.get('id'), 'title': video_title, 'formats': formats}
     
     except Exception as e:
         print(f"❌ Error getting formats: {str(e)}")
@@ -144,15 +212,22 @@ def display_formats_and_select(formats_info):
         print("⚠️ Invalid input, using best quality")
         return "best[ext=mp4]"
 
-def download_with_yt_dlp(url, output_path=DEFAULT_SAVE_PATH, format_id=None, auto_best=False, force=False):
+def download_with_yt_dlp(url, output_path=DEFAULT_SAVE_PATH, format_id=None, auto_best=False, force=False, info_ydl=None):
     """Download video using yt-dlp with selected format"""
+    import yt_dlp
+    
     try:
+        # Extract video info once - reused for format listing, filename construction and the download
+        print(f"\n📋 Fetching video information from: {url}")
+        info = extract_video_info(url, info_ydl)
+        video_title = info.get('title', 'video').replace('/', '_').replace('\\', '_')
+        
         # If auto_best is True, skip format selection
         if auto_best:
             format_id = "best[ext=mp4]"
         # First, get available formats if no format specified
         elif not format_id:
-            formats_info = get_available_formats(url)
+            formats_info = get_available_formats(url, info)
             if not formats_info:
                 print("❌ Could not retrieve format information")
                 return False
@@ -162,11 +237,6 @@ def download_with_yt_dlp(url, output_path=DEFAULT_SAVE_PATH, format_id=None, aut
         
         print(f"\n⏬ Downloading with format ID: {format_id}")
         
-        # Extract video info first to get the title for filename construction
-        with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-            info = ydl.extract_info(url, download=False)
-            video_title = info.get('title', 'video').replace('/', '_').replace('\\', '_')
-        
         # Determine filename template with timestamp if needed
         timestamp = int(time.time())
         filename_template = '%(title)s.%(ext)s'
@@ -180,6 +250,7 @@ def download_with_yt_dlp(url, output_path=DEFAULT_SAVE_PATH, format_id=None, aut
             'quiet': False,
             'no_warnings': False,
             'noplaylist': True,  # Don't download playlists
+            'extractor_args': YOUTUBE_EXTRACTOR_ARGS,
         }
         
         # Force re-download if requested
@@ -221,9 +292,10 @@ def download_with_yt_dlp(url, output_path=DEFAULT_SAVE_PATH, format_id=None, aut
                 print("Download skipped.")
                 return True
         
-        # Download the video with specific format ID
+        # Download the video with specific format ID, reusing the extracted info
+        # (possibly from a shared extractor - download_extracted_info never mutates it)
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+            info = download_extracted_info(ydl, info)
             
             # Show what was actually downloaded
             print(f"\nDownloaded format information:")
@@ -280,12 +352,15 @@ def main():
         print("❌ No URLs provided. Exiting.")
         return
     
-    # Process each URL
+    # Process each URL, sharing one extractor so connections and player JS are reused;
+    # it only extracts - each download gets a sanitized copy of the info and does its
+    # own format selection (see download_extracted_info)
     success_count = 0
-    for url in urls:
-        print(f"\n🎬 Processing: {url}")
-        if download_with_yt_dlp(url, output_dir, args.format, args.best, args.force):
-            success_count += 1
+    with create_info_extractor() as info_ydl:
+        for url in urls:
+            print(f"\n🎬 Processing: {url}")
+            if download_with_yt_dlp(url, output_dir, args.format, args.best, args.force, info_ydl):
+                success_count += 1
     
     if len(urls) > 1:
         print(f"\n✅ Downloaded {success_count} of {len(urls)} videos")